@@ -15,19 +15,48 @@ the loop packet. The ID-5001 serial protocol very much resembles the
 Hayes AT modem commands. The serial port is set to 9600 bps, 8 data bits,
 1 stop bit, no parity. No flow control is used.
 
+Responses are read directly from the serial port's file descriptor, so the
+driver needs a POSIX system (in practice Linux).
+
 """
 
 
+import array
+import binascii
+import calendar
+import os
+import queue
+import re
+import selectors
 import serial
 import syslog
+import threading
 import time
 
+try:
+    import fcntl
+    import termios
+except ImportError:
+    # Not a POSIX platform, low latency mode will not be available
+    fcntl = termios = None
+
 import weewx.drivers
 from weewx.units import INHG_PER_MBAR, kph_to_mph, CtoF, CM_PER_INCH
 from weeutil.weeutil import timestamp_to_string
 
 MILE_PER_KNOT = 1.15078
 
+# serial_struct flag from <linux/serial.h>, same as 'setserial low_latency'
+ASYNC_LOW_LATENCY = 0x2000
+
+_AT = b"AT"
+_CR = b"\r"
+
+# The fixed commands the driver sends, with their wire frames built once
+_ALL_CMDS = ("EC", "LS", "XCA", "CWGH", "RR", "RTI", "RTO", "RHI", "RHO",
+             "RWA", "RWGH", "RB", "RRR", "RWCA", "RT", "RD")
+_CMD_FRAMES = dict((cmd, _AT + cmd.encode() + _CR) for cmd in _ALL_CMDS)
+
 DRIVER_NAME = 'ID5001'
 DRIVER_VERSION = "0.1"
 
@@ -38,6 +67,18 @@ def confeditor_loader():
     return ID5001ConfEditor()
 
 
+# Whether syslog will emit LOG_DEBUG at all. Debug call sites check this
+# first so that building the message is skipped when it would be dropped.
+_DEBUG_ENABLED = True
+
+def refresh_debug_enabled():
+    global _DEBUG_ENABLED
+    _DEBUG_ENABLED = (syslog.LOG_MASK(syslog.LOG_DEBUG) &
+                      syslog.setlogmask(0)) != 0
+
+refresh_debug_enabled()
+
+
 def logmsg(level, msg):
     syslog.syslog(level, 'id-5001: %s' % msg)
 
@@ -51,8 +92,66 @@ def logerr(msg):
     logmsg(syslog.LOG_ERR, msg)
 
 
+# The prefix each polled command's response starts with. Responses in a
+# batch are matched to their commands by position, so a response that
+# doesn't start with the right prefix means the framing has slipped.
+_RESPONSE_PREFIX = {
+    "RTI": re.compile(rb"t"),
+    "RTO": re.compile(rb"T"),
+    "RHI": re.compile(rb"h"),
+    "RHO": re.compile(rb"H"),
+    "RWA": re.compile(rb"w"),
+    "RWGH": re.compile(rb"[<>]?W"),
+    "RB": re.compile(rb"B"),
+    "RR": re.compile(rb"R(?=\d)"),
+    "RRR": re.compile(rb"RR"),
+    "RWCA": re.compile(rb".cT"),
+}
+
+# Response values, matched against the raw bytes following the prefix
+_TEMPERATURE_RE = re.compile(rb"([-\d]\d\d)(C?)")
+_HUMIDITY_RE = re.compile(rb"(\d\d)")
+_WIND_RE = re.compile(rb"(\d{3})([KLM]) ?(\d{3})")
+_BAROMETER_RE = re.compile(rb"(\d{4})(M?)")
+_RAIN_RE = re.compile(rb"(?:(\d{5})|(\d{6})C)$")
+_CLOCK_RE = re.compile(rb"(\d\d)(\d\d)(\d\d)$")
+
+def _response_start(cmd, s):
+    # Returns where the value starts in the response to cmd
+    m = _RESPONSE_PREFIX[cmd].match(s)
+    if m is None:
+        raise weewx.WeeWxIOError("response %r does not belong to %s" %
+                                 (s, cmd))
+    return m.end()
+
+def _match(pattern, s, pos=0):
+    m = pattern.match(s, pos)
+    if m is None:
+        raise ValueError("unexpected response %r" % s)
+    return m
+
+# Rain is reported in hundredths of an inch or of a centimeter
+_IN_RAIN_SCALE = 1.0 / 100.0
+_CM_RAIN_SCALE = 1.0 / (100.0 * CM_PER_INCH)
+
+# Wind speed unit flag -> conversion to mph
+_WIND_CONV = {
+    b'K': lambda v, f=MILE_PER_KNOT: v * f,
+    b'L': kph_to_mph,
+    b'M': lambda v: v,
+}
+
+
+def _cmd_frame(cmd):
+    frame = _CMD_FRAMES.get(cmd)
+    if frame is None:
+        # Commands carrying a value, e.g. ST/SD, are framed on the fly
+        frame = _AT + cmd.encode() + _CR
+    return frame
+
+
 def _fmt(x):
-    return ' '.join(["%0.2X" % ord(c) for c in x])
+    return binascii.hexlify(x, b' ').decode().upper()
 
 
 class ID5001Driver(weewx.drivers.AbstractDevice):
@@ -73,6 +172,8 @@ class ID5001Driver(weewx.drivers.AbstractDevice):
         self.retry_wait = int(stn_dict.get('retry_wait', 5))
         self.loop_interval = float(stn_dict.get('loop_interval', 5.0))
         debug_serial = int(stn_dict.get('debug_serial', 0))
+        # The log mask may have changed since the module was loaded
+        refresh_debug_enabled()
         self.last_rain = None
 
         loginf('driver version is %s' % DRIVER_VERSION)
@@ -80,7 +181,22 @@ class ID5001Driver(weewx.drivers.AbstractDevice):
         self.station = Station(self.port, self.loop_interval, debug_serial=debug_serial)
         self.station.open()
 
+        # The station is polled from its own thread so that the weewx
+        # engine never waits on the serial port. Packets, or the
+        # exception that stopped polling, are handed over in _packets.
+        self._packets = queue.Queue(maxsize=4)
+        self._stop_polling = threading.Event()
+        self._poller = threading.Thread(target=self._poll_loop,
+                                        name='id5001-poll')
+        self._poller.daemon = True
+        self._poller.start()
+
     def closePort(self):
+        # Every wait in the polling thread either times out on its own
+        # or watches _stop_polling, so this join is bounded by a single
+        # exchange with the station.
+        self._stop_polling.set()
+        self._poller.join()
         if self.station is not None:
             self.station.close()
             self.station = None
@@ -96,18 +212,32 @@ class ID5001Driver(weewx.drivers.AbstractDevice):
         self.station.set_time(int(time.time()))
 
     def genLoopPackets(self):
+        while True:
+            packet = self._packets.get()
+            if isinstance(packet, Exception):
+                raise packet
+            yield packet
 
+    def _poll_loop(self):
         the_time = time.time()
 
-        while True:
+        while not self._stop_polling.is_set():
             # Wait for loop_interval to pass before getting the
             # next reading.
             sleep_time = the_time + self.loop_interval - time.time()
-            if sleep_time > 0:
-                time.sleep(sleep_time)
+            if sleep_time > 0 and self._stop_polling.wait(sleep_time):
+                break
 
-            readings = self.station.get_readings(self.max_tries,
-                                                 self.retry_wait)
+            try:
+                readings = self.station.get_readings(self.max_tries,
+                                                     self.retry_wait,
+                                                     self._stop_polling)
+            except Exception as e:
+                # Hand the failure to genLoopPackets, unless we are
+                # shutting down and the port was closed under us.
+                if not self._stop_polling.is_set():
+                    self._put_packet(e)
+                break
 
             # Note that we generate the timestamp *after* the readings are
             # taken, this accomodates the possibility that some number of
@@ -117,7 +247,17 @@ class ID5001Driver(weewx.drivers.AbstractDevice):
             packet = {'dateTime': int(time.time()), 'usUnits': weewx.US}
 
             packet.update(readings)
-            yield packet
+            self._put_packet(packet)
+
+    def _put_packet(self, packet):
+        # Don't block forever on a full queue, or closePort could never
+        # stop us.
+        while not self._stop_polling.is_set():
+            try:
+                self._packets.put(packet, timeout=self.loop_interval)
+                return
+            except queue.Full:
+                pass
 
 
 class Station(object):
@@ -125,16 +265,34 @@ class Station(object):
     DEFAULT_PORT = '/dev/ttyUSB0'
     last_rain = None
     serial_port = None
+    _selector = None
+    _in_sync = False
+    _pending = 0
     timeout = 1 # Seconds
+    inter_byte_timeout = 0.05 # Seconds
+    rx_buf_size = 64 # Bytes, comfortably more than the longest response
     bitrate = 9600
     bytesize = serial.EIGHTBITS
     parity = serial.PARITY_NONE
     stopbits = serial.STOPBITS_ONE
 
+    # Commands sent to the station on each poll, in the order they are
+    # written. The responses come back in the same order.
+    READINGS_CMDS = ("RTI", "RTO", "RHI", "RHO", "RWA", "RWGH",
+                     "RB", "RR", "RRR", "RWCA")
+
     def __init__(self, port, loop_interval, debug_serial=0):
         self._debug_serial = debug_serial
         self.port = port
         self.loop_interval = loop_interval
+        # Serialises exchanges with the station between the polling
+        # thread and the weewx engine (getTime/setTime)
+        self._lock = threading.Lock()
+        # Receive buffer reused for every response. _rx_len bytes of it
+        # are valid, and may already hold the start of the next response.
+        self._rx_buf = bytearray(self.rx_buf_size)
+        self._rx_view = memoryview(self._rx_buf)
+        self._rx_len = 0
 
     def __enter__(self):
         self.open()
@@ -144,12 +302,30 @@ class Station(object):
         self.close()
 
     def open(self):
-        logdbg("open serial port %s" % self.port)
+        if _DEBUG_ENABLED:
+            logdbg("open serial port %s" % self.port)
         self.serial_port = serial.Serial(self.port, self.bitrate,
                                          self.bytesize, self.parity,
                                          self.stopbits, xonxoff=0,
                                          rtscts=0,
                                          timeout=self.timeout)
+        # Responses are read straight from the file descriptor, waiting
+        # on it with our own selector rather than going through pyserial.
+        # timeout and inter_byte_timeout are applied there.
+        try:
+            self._selector = selectors.DefaultSelector()
+            self._selector.register(self.serial_port.fileno(),
+                                    selectors.EVENT_READ)
+        except (ValueError, OSError) as e:
+            self.close()
+            raise weewx.WeeWxIOError("serial port %s has no pollable file "
+                                     "descriptor, a POSIX system is "
+                                     "required: %s" % (self.port, e))
+        self._set_low_latency()
+        self.serial_port.reset_input_buffer()
+        self._rx_len = 0
+        self._in_sync = True
+
         # Once the port is open, send some initialization
         # commands to put the station in a known state:
         # Echo Clear
@@ -160,81 +336,211 @@ class Station(object):
 
         # auto Xmit Clear
         self.send_AT_cmd("XCA")
+        # Discard anything the station transmitted on its own before
+        # auto Xmit was cleared
+        self._in_sync = False
 
         # Reset peak wind gust for next poll cycle
         self.send_AT_cmd("CWGH")
 
         # Initialize the rainfall accumulator for the loop delta
         buf = self.send_AT_cmd("RR")
-        self.last_rain = Station._decodeRain(buf)
+        try:
+            self.last_rain = self._decode("RR", buf, Station._decodeRain)
+        except weewx.WeeWxIOError as e:
+            logerr("initial rain reading failed: %s" % e)
+            self._in_sync = False
+            self.last_rain = None
         if self.last_rain is None:
             self.last_rain = 0
 
     def close(self):
-        if self.serial_port is not None:
-            logdbg("close serial port %s" % self.port)
-            self.serial_port.close()
-            self.serial_port = None
+        # Never close the port in the middle of an exchange
+        with self._lock:
+            if self._selector is not None:
+                self._selector.close()
+                self._selector = None
+            if self.serial_port is not None:
+                if _DEBUG_ENABLED:
+                    logdbg("close serial port %s" % self.port)
+                self.serial_port.close()
+                self.serial_port = None
+
+    def _set_low_latency(self):
+        # Responses from the station are short, so the time the kernel
+        # holds received characters before handing them up to us makes
+        # up most of each command's round trip. Ask the tty layer to
+        # deliver them right away.
+        try:
+            buf = array.array('i', [0] * 32)
+            fcntl.ioctl(self.serial_port.fileno(), termios.TIOCGSERIAL, buf)
+            buf[4] |= ASYNC_LOW_LATENCY
+            fcntl.ioctl(self.serial_port.fileno(), termios.TIOCSSERIAL, buf)
+        except (AttributeError, IOError, OSError) as e:
+            if _DEBUG_ENABLED:
+                logdbg("unable to set low latency mode on %s: %s" %
+                       (self.port, e))
+
+        # FTDI USB adapters buffer for a further 16 ms by default.
+        dev = os.path.basename(os.path.realpath(self.port))
+        latency_timer = os.path.join('/sys/bus/usb-serial/devices', dev,
+                                     'latency_timer')
+        if os.path.exists(latency_timer):
+            try:
+                with open(latency_timer, 'w') as f:
+                    f.write('1')
+            except (IOError, OSError) as e:
+                if _DEBUG_ENABLED:
+                    logdbg("unable to set latency timer for %s: %s" % (dev, e))
 
     def _readline(self):
-        eol = b'\r'
-        leneol = len(eol)
-        line = bytearray()
-
+        buf = self._rx_buf
+        view = self._rx_view
         while True:
-            c = self.serial_port.read(1)
-            if c:
-                line += c
-                if line[-leneol:] == eol:
-                    break
+            eol = buf.find(b'\r', 0, self._rx_len)
+            if eol >= 0:
+                line = bytes(view[:eol + 1])
+                rest = self._rx_len - eol - 1
+                view[:rest] = view[eol + 1:self._rx_len]
+                self._rx_len = rest
+                return line
+
+            if self._rx_len == len(buf):
+                # No terminator in a full buffer, hand it back as is
+                # and let the decoders reject it.
+                line = bytes(buf)
+                self._rx_len = 0
+                return line
+
+            # Once part of a line is in, the rest should follow closely.
+            # A lone line feed left over from the previous response
+            # doesn't count.
+            if self._rx_len and buf[self._rx_len - 1] not in b'\n':
+                timeout = self.inter_byte_timeout
             else:
-                break
+                timeout = self.timeout
+            # Report I/O errors the way pyserial's own read would, so
+            # callers' SerialException handling still applies.
+            try:
+                ready = self._selector.select(timeout)
+            except OSError as e:
+                raise serial.serialutil.SerialException("read failed: %s" % e)
+            if not ready:
+                # Timed out, return the partial line
+                line = bytes(view[:self._rx_len])
+                self._rx_len = 0
+                return line
 
-        return line.decode()
+            try:
+                n = os.readv(self.serial_port.fileno(), [view[self._rx_len:]])
+            except BlockingIOError:
+                continue
+            except OSError as e:
+                raise serial.serialutil.SerialException("read failed: %s" % e)
+            if not n:
+                raise serial.serialutil.SerialException(
+                    "device reports readiness to read but returned no data")
+            self._rx_len += n
+
+    def _sync_input(self):
+        # Every response is read in full, so the input buffer only needs
+        # flushing after an exchange with the station went wrong.
+        if not self._in_sync:
+            self.serial_port.reset_input_buffer()
+            self._rx_len = 0
+            self._pending = 0
+            self._in_sync = True
+
+    def _discard_pending(self):
+        # Responses to commands sent with send_AT_nowait() are only
+        # read, and dropped, at the start of the next exchange.
+        while self._pending:
+            self._pending -= 1
+            self._readline()
 
     def send_AT_cmd(self, cmd):
-        self.serial_port.reset_input_buffer()
-        self.serial_port.write(str.encode("AT"))
-        self.serial_port.write(str.encode(cmd))
-        self.serial_port.write(str.encode("\r"))
-        self.serial_port.flush()
-        # print "Sent AT%s\\r" % cmd
+        with self._lock:
+            self._sync_input()
+            # No flush() needed, the station only answers after it has
+            # received the whole frame, so the read below waits for it
+            # anyway.
+            self.serial_port.write(_cmd_frame(cmd))
+            # print "Sent AT%s\\r" % cmd
+            self._discard_pending()
 
-        response = self._readline()
+            response = self._readline()
 
         # print("Recvd %s\n" % response)
 
         return response.strip()
 
+    def send_AT_batch(self, cmds):
+        """Send several commands back-to-back and collect their responses.
+
+        All of the commands are written to the station in one go, then one
+        response line is read per command. The responses are returned in
+        the same order as the commands.
+        """
+        with self._lock:
+            self._sync_input()
+            self.serial_port.write(b''.join([_cmd_frame(cmd) for cmd in cmds]))
+            self._discard_pending()
+
+            responses = []
+            for _ in cmds:
+                responses.append(self._readline().strip())
+                if not responses[-1]:
+                    # Timed out, don't wait out the rest as well
+                    responses.extend([b''] * (len(cmds) - len(responses)))
+                    break
+
+            return responses
+
+    def send_AT_nowait(self, cmd):
+        """Send a command whose response is of no interest.
+
+        The response is not waited for here, it is discarded by the next
+        send_AT_cmd() or send_AT_batch() instead.
+        """
+        with self._lock:
+            self._sync_input()
+            self.serial_port.write(_cmd_frame(cmd))
+            self._pending += 1
+
     def set_time(self, ts):
-        local_time = time.localtime(ts)
-        set_time_cmd = "ST%2.2d%2.2d%2.2d" % (local_time.tm_hour,
-                                              local_time.tm_min,
-                                              local_time.tm_sec)
-        logdbg("set station time to %s (%s)" % (timestamp_to_string(ts),
-                                                set_time_cmd))
-        self.send_AT_cmd(set_time_cmd)
-
-        set_date_cmd = "SD%2.2d%2.2d%2.2d" % (local_time.tm_year % 100,
-                                              local_time.tm_mon,
-                                              local_time.tm_mday)
-        logdbg("set station date to %s (%s)" % (timestamp_to_string(ts),
-                                                set_date_cmd))
-        self.send_AT_cmd(set_date_cmd)
+        # The station clock is kept in GMT, see get_time()
+        gmt = time.gmtime(ts)
+        set_time_cmd = "ST%2.2d%2.2d%2.2d" % (gmt.tm_hour,
+                                              gmt.tm_min,
+                                              gmt.tm_sec)
+        if _DEBUG_ENABLED:
+            logdbg("set station time to %s (%s)" % (timestamp_to_string(ts),
+                                                    set_time_cmd))
+
+        set_date_cmd = "SD%2.2d%2.2d%2.2d" % (gmt.tm_year % 100,
+                                              gmt.tm_mon,
+                                              gmt.tm_mday)
+        if _DEBUG_ENABLED:
+            logdbg("set station date to %s (%s)" % (timestamp_to_string(ts),
+                                                    set_date_cmd))
+
+        # Both commands go out in one write
+        responses = self.send_AT_batch((set_time_cmd, set_date_cmd))
+        if not all(responses):
+            # A reply that turns up late would shift the next exchange,
+            # so flush before it.
+            logerr("set_time failed: no response from station")
+            self._in_sync = False
 
     def get_time(self):
         try:
-            sta_time = int(self.send_AT_cmd("RT"))
-            sta_date = int(self.send_AT_cmd("RD"))
-            # break sta_time into hh:mm:ss
-            hh = sta_time // 10000
-            mm = sta_time // 100 - (hh * 100)
-            ss = sta_time - (mm * 100) - (hh * 10000)
-
-            # break sta_date into YY:MM:DD
-            YY = sta_date // 10000
-            MM = sta_date // 100 - (YY * 100)
-            DD = sta_date - (MM * 100) - (YY * 10000)
+            # The station answers with fixed width hhmmss and YYMMDD.
+            # Anything else is rejected rather than letting the fields
+            # shift.
+            sta_time = self.send_AT_cmd("RT")
+            sta_date = self.send_AT_cmd("RD")
+            hh, mm, ss = map(int, _match(_CLOCK_RE, sta_time).groups())
+            YY, MM, DD = map(int, _match(_CLOCK_RE, sta_date).groups())
 
             # two-digit year hack - this station defaults to a epoch of 1987
             # when power is lost. If the year is greater than 86, we assume
@@ -247,47 +553,63 @@ class Station(object):
 
             # We keep the station clock in GMT, which eliminates the
             # DST silliness.
-            ts = time.mktime((year, MM, DD, hh, mm, ss, 0, 0, -1))
-            logdbg("station date: %s, time: %s, (%s)" %
-                   (sta_date, sta_time, timestamp_to_string(ts)))
+            ts = calendar.timegm((year, MM, DD, hh, mm, ss, 0, 0, 0))
+            if _DEBUG_ENABLED:
+                logdbg("station date: %s, time: %s, (%s)" %
+                       (sta_date.decode(), sta_time.decode(),
+                        timestamp_to_string(ts)))
             return ts
 
-        except (serial.serialutil.SerialException, weewx.WeeWxIOError) as e:
+        except (serial.serialutil.SerialException, weewx.WeeWxIOError,
+                ValueError) as e:
             logerr("get_time failed: %s" % e)
+            self._in_sync = False
         return int(time.time())
 
-    def get_readings(self, max_tries=3, retry_wait=3):
-        data = dict()
+    def get_readings(self, max_tries=3, retry_wait=3, stop=None):
+        # stop, if given, is a threading.Event that cuts short the wait
+        # between retries.
         for ntries in range(0, max_tries):
+            data = dict()
+            buf = None
             try:
-                buf = self.send_AT_cmd("RTI")
-                data['inTemp'] = Station._decodeTemperature(buf)
-
-                buf = self.send_AT_cmd("RTO")
-                data['outTemp'] = Station._decodeTemperature(buf)
-
-                buf = self.send_AT_cmd("RHI")
-                data['inHumidity'] = Station._decodeHumidity(buf)
-
-                buf = self.send_AT_cmd("RHO")
-                data['outHumidity'] = Station._decodeHumidity(buf)
-
-                buf = self.send_AT_cmd("RWA")
-                data['windSpeed'] = Station._decodeWindSpeed(buf)
-                data['windDir'] = Station._decodeWindDirection(buf)
-
-                buf = self.send_AT_cmd("RWGH")
-                data['windGust'] = Station._decodeWindSpeed(buf)
-                data['windGustDir'] = Station._decodeWindDirection(buf)
-
-                buf = self.send_AT_cmd("CWGH")
-                # clears Wind Gust High for next cycle
-
-                buf = self.send_AT_cmd("RB")
-                data['barometer'] = Station._decodeBarometer(buf)
-
-                buf = self.send_AT_cmd("RR")
-                this_rain = Station._decodeRain(buf)
+                buf = self.send_AT_batch(self.READINGS_CMDS)
+                if not all(buf):
+                    raise weewx.WeeWxIOError("no response from station")
+                resp = dict(zip(self.READINGS_CMDS, buf))
+
+                # A response that belongs to some other command means
+                # the rest of the batch is shifted too. Check them all
+                # before using any, so nothing from a bad batch (least
+                # of all last_rain) is kept and the poll is retried.
+                for cmd in self.READINGS_CMDS:
+                    _response_start(cmd, resp[cmd])
+
+                # Clear Wind Gust High for the next cycle. Its response
+                # is picked up with the next poll rather than waited for.
+                self.send_AT_nowait("CWGH")
+
+                # With the framing good, a garbled value only costs its
+                # own reading, see _decode().
+                data['inTemp'] = self._decode(
+                    "RTI", resp["RTI"], Station._decodeTemperature)
+                data['outTemp'] = self._decode(
+                    "RTO", resp["RTO"], Station._decodeTemperature)
+                data['inHumidity'] = self._decode(
+                    "RHI", resp["RHI"], Station._decodeHumidity)
+                data['outHumidity'] = self._decode(
+                    "RHO", resp["RHO"], Station._decodeHumidity)
+
+                data['windSpeed'], data['windDir'] = self._decode(
+                    "RWA", resp["RWA"], Station._decodeWind, (None, None))
+
+                data['windGust'], data['windGustDir'] = self._decode(
+                    "RWGH", resp["RWGH"], Station._decodeWind, (None, None))
+
+                data['barometer'] = self._decode(
+                    "RB", resp["RB"], Station._decodeBarometer)
+
+                this_rain = self._decode("RR", resp["RR"], Station._decodeRain)
                 if this_rain != None:
                     rain_delta = this_rain - self.last_rain
                     if rain_delta < 0.0:
@@ -298,124 +620,89 @@ class Station(object):
                     self.last_rain = this_rain
                     data['rain'] = rain_delta
 
-                buf = self.send_AT_cmd("RRR")
-                data['rain_rate'] = Station._decodeRain(buf)
+                data['rain_rate'] = self._decode(
+                    "RRR", resp["RRR"], Station._decodeRain)
 
-                buf = self.send_AT_cmd("RWCA")
-                buf = buf[1:]
-                data['windhcill'] = Station._decodeTemperature(buf)
+                data['windhcill'] = self._decode(
+                    "RWCA", resp["RWCA"], Station._decodeTemperature)
 
                 return data
 
             except (serial.serialutil.SerialException,
-                    IndexError, weewx.WeeWxIOError) as e:
+                    weewx.WeeWxIOError) as e:
                 loginf("Failed attempt %d of %d to get readings: %s, buf = %s" %
                        (ntries + 1, max_tries, e, buf))
-                time.sleep(retry_wait)
+                self._in_sync = False
+                if stop is None:
+                    time.sleep(retry_wait)
+                elif stop.wait(retry_wait):
+                    raise weewx.WeeWxIOError("stopped while retrying")
 
         msg = "Max retries (%d) exceeded for readings" % max_tries
         logerr(msg)
         raise weewx.RetriesExceeded(msg)
 
+    def _decode(self, cmd, buf, decoder, failed=None):
+        # Decode the response to cmd, returning failed if its value is
+        # garbled. The input buffer is flushed before the next exchange,
+        # in case the garbage came from stray bytes that would upset the
+        # framing. A response to some other command raises WeeWxIOError.
+        pos = _response_start(cmd, buf)
+        try:
+            return decoder(buf, pos)
+        except ValueError:
+            logerr("conversion of buffer failed: %s" % buf)
+            self._in_sync = False
+            return failed
+
+
+    # The decoders below take the response and the position of its value,
+    # just past the prefix checked by _response_start().
 
     @staticmethod
-    def _decodeTemperature(s):
+    def _decodeTemperature(s, pos):
         # tnnn[C] Indoor Temperature
         # Tnnn[C] Outdoor Temperature
-        # cTnnn[C] Wind Chill
-        if s[0] == 'c':
-            s = s[1:]
-
-        isCelsius = (s[-1] == 'C')
-
-        try:
-            temp = int(s[1:4])
-            if isCelsius:
-                temp = CtoF(temp)
-        except Exception:
-            logerr("conversion of buffer failed: %s" % s)
-            temp = None
+        # xcTnnn[C] Wind Chill
+        m = _match(_TEMPERATURE_RE, s, pos)
+        temp = int(m.group(1))
+        if m.group(2):
+            temp = CtoF(temp)
 
         return temp
 
     @staticmethod
-    def _decodeHumidity(s):
+    def _decodeHumidity(s, pos):
         # hnn Indoor Humidity
         # Hnn Outdoor Humidity
-        try:
-            humidity = int(s[1:3])
-        except Exception:
-            logerr("conversion of buffer failed: %s" % s)
-            humidity = None
-
-        return humidity
-
-
-    @staticmethod
-    def _decodeWindSpeed(s):
-        # wnnn[K|L|M]nnnD Wind Average
-        # <Wnnn[K|L|M] nnnD Wind Gust High
-        # A '<' or '>' symbol at the begining of the buffer indicates
-        # that this is a high or low reading. The rest of the message
-        # decodes the same at the average or gust messages.
-        if (s[0] == '<') or (s[0] == '>'):
-            s = s[1:]
-
-        try:
-            isKnots = (s[4] == 'K')
-            isMPH = (s[4] == 'M')
-            isKPH = (s[4] == 'L')
-        
-            windSpeed = int(s[1:4])
-            if isKnots:
-                windSpeed *= MILE_PER_KNOT
-            elif isKPH:
-                windSpeed = kph_to_mph(windSpeed)
-            elif isMPH:
-                pass
-
-        except Exception:
-            logerr("conversion of buffer failed: %s" % s)
-            windSpeed = None
-
-        return windSpeed
+        return int(_match(_HUMIDITY_RE, s, pos).group(1))
 
 
     @staticmethod
-    def _decodeWindDirection(s):
+    def _decodeWind(s, pos):
         # wnnn[K|L|M]nnnD Wind Average
         # <Wnnn[K|L|M] nnnD Wind Gust High
         # A '<' or '>' symbol at the begining of the buffer indicates
         # that this is a high or low reading. The rest of the message
         # decodes the same at the average or gust messages.
-        if (s[0] == '<') or (s[0] == '>'):
-            s = s[1:]
-
-        try:
-            windDirection = int(s[5:8])
-        except Exception:
-            logerr("conversion of buffer failed: %s" % s)
-            windDirection = None
+        # Returns a (speed, direction) tuple.
+        m = _match(_WIND_RE, s, pos)
+        windSpeed = _WIND_CONV[m.group(2)](int(m.group(1)))
+        windDirection = int(m.group(3))
 
-        return windDirection
+        return windSpeed, windDirection
 
 
     @staticmethod
-    def _decodeBarometer(s):
+    def _decodeBarometer(s, pos):
         # Bnnnn[M] Barometer
-        try:
-            isMillibars = (s[-1] == 'M')
-
-            baro = int(s[1:5])
-
-            if isMillibars:
-                baro *= INHG_PER_MBAR
-            else:
-                baro /= 100.0
+        m = _match(_BAROMETER_RE, s, pos)
+        baro = int(m.group(1))
 
-        except Exception:
-            logerr("conversion of buffer failed: %s" % s)
-            baro = None
+        if m.group(2):
+            baro *= INHG_PER_MBAR
+        else:
+            baro /= 100.0
 
         if (baro == 0.0):
             # Unless someone launched the sensor into space, a
@@ -425,26 +712,15 @@ class Station(object):
         return baro
 
     @staticmethod
-    def _decodeRain(s):
+    def _decodeRain(s, pos):
         # Rnnnnn[nC] Rainfail
         # RRnnnnn[nC] Rainfail Rate
-        try:
-            if (s[1] == 'R'):
-                # This is a rain rate message, we discard the first char
-                # and then parse it like a rain total message.
-                s = s[1:]
-
-            if (s[-1] == 'C'):
-                # measurement in centimeters
-                rain = int(s[1:7]) / 100.0 / CM_PER_INCH
-            else:
-                rain = int(s[1:6]) / 100.0
-
-        except Exception:
-            logerr("conversion of buffer failed: %s" % s)
-            rain = None
-
-        return rain
+        # Five digits are inches, six digits and a trailing C are
+        # centimeters. Any other digit count is a garbled reply.
+        inches, cm = _match(_RAIN_RE, s, pos).groups()
+        if cm is not None:
+            return int(cm) * _CM_RAIN_SCALE
+        return int(inches) * _IN_RAIN_SCALE
 
 
 class ID5001ConfEditor(weewx.drivers.AbstractConfEditor):